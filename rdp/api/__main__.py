@@ -0,0 +1,32 @@
+"""Start the api with uvicorn.
+
+    python -m rdp.api --host 0.0.0.0 --port 8000
+
+The server runs on uvloop and the httptools parser where they are installed (not on windows),
+otherwise on asyncio and h11. Every worker starts its own sensor reader,
+so keep --workers at 1 unless the reader is disabled.
+"""
+import argparse
+
+import uvicorn
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="rdp-api", description="restful api for rdp")
+    parser.add_argument("--host", default="127.0.0.1", help="address to bind to")
+    parser.add_argument("--port", type=int, default=8000, help="port to bind to")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes")
+    args = parser.parse_args()
+    uvicorn.run(
+        "rdp.api.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        # auto picks uvloop and httptools if available
+        loop="auto",
+        http="auto",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict
+
 
 class ValueTypeNoID(BaseModel):
     type_name: str
@@ -12,13 +14,13 @@ class ValueNoID(BaseModel):
     value_type_id: int
     time: int
     value: float
-    device_id: int
+    device_id: Optional[int] = None
+
 
 class Value(ValueNoID):
-    id: int
+    model_config = ConfigDict(from_attributes=True)
 
-    class Config:
-        orm_mode = True
+    id: int
 
 class ApiDescription(BaseModel):
     description: str = "This is the Api"
@@ -30,40 +32,28 @@ class DeviceBase(BaseModel):
     description: Optional[str] = None
     location_id: Optional[int] = None
 
-class Device(DeviceBase):
-    id: int
 
+class DeviceCreate(DeviceBase):
+    pass
 
-    class Config:
-        orm_mode = True
 
-class LocationNoID(BaseModel):
-    name: str
+class Device(DeviceBase):
+    model_config = ConfigDict(from_attributes=True)
 
-class Location(LocationNoID):
     id: int
 
-    class Config:
-        orm_mode = True
 
-class DeviceCreate(BaseModel):
+class LocationNoID(BaseModel):
     name: str
-    description: Optional[str] = None
-    location_id: Optional[int] = None
 
-class DeviceBase(BaseModel):
-    class Config:
-        from_attributes = True
 
-class Location(BaseModel):
-    id: int
-    name: str
+class Location(LocationNoID):
+    model_config = ConfigDict(from_attributes=True)
 
-    class Config:
-        from_attributes = True  # was orm_mode in previous versions
+    id: int
 
 class ValueCreate(BaseModel):
     value_time: int
     value_type_id: int
     value: float
-    device_id: Optional[int]
\ No newline at end of file
+    device_id: Optional[int]
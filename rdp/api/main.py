@@ -1,26 +1,93 @@
-from typing import Union, List
+import logging
+from itertools import islice
 from random import shuffle
-from .api_types import Device, DeviceCreate  # Make sure Device is imported
+from typing import AsyncIterator, Iterable, Iterator, List, Union
 
+import anyio.to_thread
+import orjson
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
 
-from fastapi import FastAPI, HTTPException
-from .api_types import ValueCreate
+from rdp.crud import Crud, create_engine
 from rdp.sensor import Reader
-from rdp.crud import create_engine, Crud
+
 from . import api_types as ApiTypes
-import logging
+from .api_types import Device, DeviceCreate, ValueCreate  # Make sure Device is imported
+from .responses import ORJSONResponse
 
 logger = logging.getLogger("rdp.api")
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
+
+# the api description never changes, so it is serialized only once
+_ROOT_JSON = orjson.dumps(ApiTypes.ApiDescription().model_dump())
+
+# upper bound of the page size of /value/, larger exports go through /value/stream
+_MAX_PAGE_SIZE = 10000
+
+
+def _value_to_dict(value) -> dict:
+    """Project a value row onto the fields of ApiTypes.Value, leaving out a missing device_id"""
+    row = {
+        "id": value.id,
+        "time": value.time,
+        "value": value.value,
+        "value_type_id": value.value_type_id,
+    }
+    if value.device_id is not None:
+        row["device_id"] = value.device_id
+    return row
+
+
+def _device_to_dict(device) -> dict:
+    """Project a device row onto the fields of ApiTypes.Device, leaving out unset optionals"""
+    row = {"id": device.id, "name": device.name}
+    if device.description is not None:
+        row["description"] = device.description
+    if device.location_id is not None:
+        row["location_id"] = device.location_id
+    return row
 
-@app.get("/")
-def read_root() -> ApiTypes.ApiDescription:
+
+def _ndjson_chunks(values: Iterable, chunk_size: int = 1000) -> Iterator[bytes]:
+    """Encode value rows as newline delimited json, chunk_size rows per yielded chunk.
+
+    StreamingResponse moves every next() of a sync iterator to the threadpool, chunks keep that
+    at one hop per batch.
+    """
+    values = iter(values)
+    try:
+        while chunk := list(islice(values, chunk_size)):
+            yield b"".join(orjson.dumps(_value_to_dict(value)) + b"\n" for value in chunk)
+    finally:
+        # closing the generator of crud.get_values_iter ends its session
+        if hasattr(values, "close"):
+            values.close()
+
+
+async def _ndjson_stream(values: Iterable) -> AsyncIterator[bytes]:
+    """Run _ndjson_chunks in the threadpool and close it as soon as the response ends.
+
+    A client which disconnects cancels the response, without the close the session and cursor
+    would stay open until the generator is garbage collected.
+    """
+    chunks = _ndjson_chunks(values)
+    try:
+        async for chunk in iterate_in_threadpool(chunks):
+            yield chunk
+    finally:
+        with anyio.CancelScope(shield=True):
+            await anyio.to_thread.run_sync(chunks.close)
+
+
+@app.get("/", response_model=ApiTypes.ApiDescription)
+def read_root() -> Response:
     """This url returns a simple description of the api
 
     Returns:
-        ApiTypes.ApiDescription: the Api description in json format 
+        Response: the Api description in json format
     """    
-    return ApiTypes.ApiDescription()
+    return Response(content=_ROOT_JSON, media_type="application/json")
 
 
 @app.get("/type/{id}/")
@@ -44,7 +111,7 @@ def read_type(id: int) -> ApiTypes.ValueType:
     return value_type 
 
 @app.put("/type/{id}/")
-def put_type(id, value_type: ApiTypes.ValueTypeNoID) -> ApiTypes.ValueType:
+def put_type(id: int, value_type: ApiTypes.ValueTypeNoID) -> ApiTypes.ValueType:
     """PUT request to a specail valuetype. This api call is used to change a value type object.
 
     Args:
@@ -64,27 +131,56 @@ def put_type(id, value_type: ApiTypes.ValueTypeNoID) -> ApiTypes.ValueType:
     except crud.NoResultFound:
         raise HTTPException(status_code=404, detail="Item not found")
 
-@app.get("/value/")
-def get_values(type_id:int=None, start:int=None, end:int=None) -> List[ApiTypes.Value]:
-    """Get values from the database. The default is to return all available values. This result can be filtered.
+
+@app.get("/value/", responses={200: {"model": List[ApiTypes.Value]}})
+def get_values(
+    type_id: int = None,
+    start: int = None,
+    end: int = None,
+    limit: int = Query(1000, ge=1, le=_MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+) -> ORJSONResponse:
+    """Get values from the database. The default is to return the first 1000 values.
+    This result can be filtered.
 
     Args:
         type_id (int, optional): If set, only values of this type are returned. Defaults to None.
         start (int, optional): If set, only values at least as new are returned. Defaults to None.
         end (int, optional): If set, only values not newer than this are returned. Defaults to None.
+        limit (int, optional): Maximum number of values returned, at most 10000. Defaults to 1000.
+        offset (int, optional): Number of values skipped, used to fetch the following pages.
+            Defaults to 0.
 
     Raises:
         HTTPException: _description_
 
     Returns:
-        List[ApiTypes.Value]: _description_
+        ORJSONResponse: List of values in json format
     """
     global crud
     try:
-        values = crud.get_values(type_id, start, end)
-        return values
+        values = crud.get_values_raw(type_id, start, end, limit=limit, offset=offset)
+        return ORJSONResponse(content=[_value_to_dict(value) for value in values])
     except crud.NoResultFound:
-        raise HTTPException(status_code=404, deltail="Item not found")
+        raise HTTPException(status_code=404, detail="Item not found")
+
+
+@app.get("/value/stream")
+def stream_values(type_id: int = None, start: int = None, end: int = None) -> StreamingResponse:
+    """Stream all matching values as newline delimited json. Unlike /value/ the result is not
+    paginated, the values are read from the database in batches while the response is sent.
+
+    Args:
+        type_id (int, optional): If set, only values of this type are returned. Defaults to None.
+        start (int, optional): If set, only values at least as new are returned. Defaults to None.
+        end (int, optional): If set, only values not newer than this are returned.
+            Defaults to None.
+
+    Returns:
+        StreamingResponse: one json object per value and line
+    """
+    values = crud.get_values_iter(type_id, start, end)
+    return StreamingResponse(_ndjson_stream(values), media_type="application/x-ndjson")
 
 @app.on_event("startup")
 async def startup_event() -> None:
@@ -92,7 +188,17 @@ async def startup_event() -> None:
     """    
     logger.info("STARTUP: Sensor reader!")
     global reader, crud
-    engine = create_engine("sqlite:///rdb.test.db")
+    # the endpoints are blocking and run in the anyio threadpool,
+    # the default of 40 threads stalls under load
+    anyio.to_thread.current_default_thread_limiter().total_tokens = 200
+    engine = create_engine(
+        "sqlite:///rdb.test.db",
+        connect_args={"check_same_thread": False},
+        pool_size=10,
+        max_overflow=20,
+        pool_pre_ping=True,
+        query_cache_size=1200,
+    )
     crud = Crud(engine)
     reader = Reader(crud)
     reader.start()
@@ -104,36 +210,38 @@ async def shutdown_event():
     """    
     global reader
     logger.debug("SHUTDOWN: Sensor reader!")
-    reader.stop()
+    await reader.stop()
     logger.info("SHUTDOWN: Sensor reader completed!")
 
 
-@app.post("/create_location/", response_model=ApiTypes.Location)
-def create_location(location_data: ApiTypes.LocationNoID):
+@app.post("/create_location/", responses={200: {"model": ApiTypes.Location}})
+def create_location(location_data: ApiTypes.LocationNoID) -> ORJSONResponse:
     """Create a new location with the given name.
     Args:
         location_data (ApiTypes.LocationNoID): The name of the new location.
 
     Returns:
-        ApiTypes.Location: The created location with its ID and name.
+        ORJSONResponse: The created location with its ID and name.
     """
     try:
         new_location = crud.create_location(name=location_data.name)
-        return ApiTypes.Location(id=new_location.id, name=new_location.name)
+        # row comes straight from the database,
+        # it is returned without a response model to validate it again
+        return ORJSONResponse(content={"id": new_location.id, "name": new_location.name})
     except crud.IntegrityError as e:
         logger.error(f"Failed to create a new location: {e}")
         raise HTTPException(status_code=400, detail="Failed to create a new location due to a database error.")
 
 
-@app.get("/device/{device_id}/", response_model=ApiTypes.Device)
-def get_device(device_id: int):
+@app.get("/device/{device_id}/", responses={200: {"model": ApiTypes.Device}})
+def get_device(device_id: int) -> ORJSONResponse:
     """API-Endpunkt, um ein Gerät anhand seiner ID zu holen.
 
     Args:
         device_id (int): Die ID des gewünschten Geräts.
 
     Returns:
-        ApiTypes.Device: Die Details des Geräts, wenn gefunden.
+        ORJSONResponse: Die Details des Geräts, wenn gefunden.
 
     Raises:
         HTTPException: Wenn kein Gerät mit der angegebenen ID gefunden wird.
@@ -141,50 +249,45 @@ def get_device(device_id: int):
     global crud
     try:
         device = crud.get_device(device_id)
-        return ApiTypes.Device(
-            id=device.id, 
-            name=device.name, 
-            description=device.description, 
-            location_id=device.location_id
-        )
+        # Daten stammen aus der Datenbank (SQLAlchemy) und sind bereits gültig,
+        # kein Response-Model prüft sie erneut
+        return ORJSONResponse(content=_device_to_dict(device))
     except crud.NoResultFound:
         raise HTTPException(status_code=404, detail="Device not found")
 
 
-@app.get("/locations/", response_model=List[ApiTypes.Location])
-def read_locations():
+@app.get("/locations/", responses={200: {"model": List[ApiTypes.Location]}})
+def read_locations() -> ORJSONResponse:
     """API-Endpunkt, um alle Locations zu erhalten.
 
     Returns:
-        List[ApiTypes.Location]: Die Liste aller Locations.
+        ORJSONResponse: Die Liste aller Locations im JSON-Format.
     """
     try:
-        locations = crud.get_all_locations()
-        return [ApiTypes.Location.from_orm(location) for location in locations]
+        locations = crud.get_all_locations_raw()
+        return ORJSONResponse(
+            content=[{"id": location.id, "name": location.name} for location in locations]
+        )
     except Exception as e:
         logger.error(f"Failed to fetch locations: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch locations")
 
 
-
-@app.post("/devices/", response_model=Device)
-def create_device(device_data: DeviceCreate):
+@app.post("/devices/", responses={200: {"model": Device}})
+def create_device(device_data: DeviceCreate) -> ORJSONResponse:
     """Create a new device with the provided details.
 
     Args:
         device_data (DeviceCreate): The data needed to create a new device.
 
     Returns:
-        Device: The created device with its ID and other details.
+        ORJSONResponse: The created device with its ID and other details.
     """
     try:
         new_device = crud.add_device(name=device_data.name, description=device_data.description, location_id=device_data.location_id)
-        return Device(
-            id=new_device.id,
-            name=new_device.name,
-            description=new_device.description,
-            location_id=new_device.location_id
-        )
+        # row comes straight from the database,
+        # it is returned without a response model to validate it again
+        return ORJSONResponse(content=_device_to_dict(new_device))
     except crud.IntegrityError as e:
         logger.error(f"Failed to create a new device: {e}")
         raise HTTPException(status_code=400, detail="Failed to create a new device due to a database error.")
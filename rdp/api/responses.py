@@ -0,0 +1,37 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _default(obj: Any) -> Any:
+    """Fallback for objects orjson cannot serialize natively.
+
+    Args:
+        obj (Any): the object to be serialized
+
+    Raises:
+        TypeError: Thrown if the object type is not supported
+
+    Returns:
+        Any: a json serializable representation of obj
+    """
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, used as the default response class of the api.
+
+    Content is dumped as-is, so routes returning this response skip
+    jsonable_encoder and the response model validation of FastAPI.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
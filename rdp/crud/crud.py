@@ -1,28 +1,171 @@
 import logging
-from typing import List
+import threading
+from itertools import product
+from typing import Callable, Iterator, List, Set, Tuple
 
-from sqlalchemy import select
+from cachetools import TTLCache, cachedmethod
+from sqlalchemy import Row, bindparam, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import IntegrityError, NoResultFound
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql import Select
 
 from .model import Base, Value, ValueType, Location, Device
 from random import shuffle
 
 
+def _values_stmt(stmt: Select, by_type: bool, by_start: bool, by_end: bool) -> Select:
+    if by_type:
+        stmt = stmt.where(Value.value_type_id == bindparam("value_type_id"))
+    if by_start:
+        stmt = stmt.where(Value.time >= bindparam("start"))
+    if by_end:
+        stmt = stmt.where(Value.time <= bindparam("end"))
+    # time is not unique, the id keeps the order and therefore the pages stable
+    return stmt.order_by(Value.time, Value.id)
+
+
+def _pick_values_stmt(
+    statements: dict,
+    value_type_id: int,
+    start: int,
+    end: int,
+    limit: int = None,
+    offset: int = None,
+) -> Tuple[Select, dict]:
+    stmt = statements[(value_type_id is not None, start is not None, end is not None)]
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    if offset:
+        stmt = stmt.offset(offset)
+    return stmt, {"value_type_id": value_type_id, "start": start, "end": end}
+
+
+# rows per executemany call in add_values_bulk
+_BULK_CHUNK_SIZE = 1000
+
+# statements are built once at import time, the per call parameters are passed as bind values
+_STMT_VALUE_TYPES = select(ValueType)
+_STMT_VALUE_TYPE_IDS = select(ValueType.id)
+_STMT_VALUE_TYPE_BY_ID = select(ValueType).where(ValueType.id == bindparam("value_type_id"))
+_STMT_VALUES = {
+    filters: _values_stmt(select(Value), *filters)
+    for filters in product((False, True), repeat=3)
+}
+# plain columns for read only results, skips building ORM objects
+_STMT_VALUE_ROWS = {
+    filters: _values_stmt(
+        select(Value.id, Value.time, Value.value, Value.value_type_id, Value.device_id), *filters
+    )
+    for filters in product((False, True), repeat=3)
+}
+_STMT_ALL_DEVICE_IDS = select(Device.id)
+_STMT_ALL_LOCATIONS = select(Location)
+_STMT_ALL_LOCATION_ROWS = select(Location.id, Location.name)
+
+
+def _cached(name: str):
+    """Memoize a Crud method without arguments in the reference data cache of the instance.
+
+    The key contains the schema version, so a result read before an invalidate() is never served
+    after it.
+    """
+    return cachedmethod(
+        lambda self: self._cache,
+        key=lambda self: (name, self._schema_version),
+        lock=lambda self: self._cache_lock,
+    )
+
+
+# dialects supporting INSERT ... ON CONFLICT DO NOTHING
+_DIALECT_INSERT = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _insert_skip_duplicates(dialect_name: str, table, index_elements: List[str]):
+    """Insert statement which skips rows conflicting on index_elements.
+
+    Other dialects get a plain insert, there a conflicting row raises IntegrityError.
+    """
+    dialect_insert = _DIALECT_INSERT.get(dialect_name)
+    if dialect_insert is None:
+        return insert(table)
+    return dialect_insert(table).on_conflict_do_nothing(index_elements=index_elements)
+
+
 class Crud:
     def __init__(self, engine):
         self._engine = engine
+        # objects stay loaded after commit, they are handed out detached from their session anyway
+        self._Session = sessionmaker(bind=engine, expire_on_commit=False)
         self.IntegrityError = IntegrityError
         self.NoResultFound = NoResultFound
+        # reference data which rarely changes, cleared whenever it is written
+        self._cache = TTLCache(maxsize=8, ttl=30)
+        self._cache_lock = threading.RLock()
+        self._schema_version = 0
 
         Base.metadata.create_all(self._engine)
+        dialect = engine.dialect.name
+        self._stmt_add_value_type = _insert_skip_duplicates(dialect, ValueType.__table__, ["id"])
+        # duplicates are skipped by the database instead of failing the whole batch
+        self._stmt_add_values = _insert_skip_duplicates(
+            dialect, Value.__table__, ["time", "value_type_id", "device_id"]
+        )
+        # ids of value types known to exist, so adding values does not have to look them up
+        self._value_type_ids: Set[int] = set(self.get_value_type_ids())
+        self._device_listeners: List[Callable[[Device], None]] = []
+
+    def invalidate(self) -> None:
+        """Drop the cached value types, locations and device ids and reload the known value types.
+
+        Call it after changing these tables outside of Crud.
+        """
+        with self._cache_lock:
+            self._drop_cache()
+            self._value_type_ids = set(self.get_value_type_ids())
+
+    def _drop_cache(self) -> None:
+        # called after every write through Crud, the known value type ids are kept up to date there
+        with self._cache_lock:
+            self._schema_version += 1
+            self._cache.clear()
+
+    def _ensure_value_types(self, session: Session, type_ids: Set[int]) -> Set[int]:
+        """Add a default ValueType for every id not known to exist yet, without committing.
+
+        Only ids missing in the cache hit the database, existing rows are skipped by the database.
+
+        Args:
+            session (Session): the session of the caller
+            type_ids (Set[int]): ValueType ids which have to exist
+
+        Returns:
+            Set[int]: the ids which were not cached, to be passed to _add_known_value_types after
+                commit
+        """
+        new_types = type_ids - self._value_type_ids
+        if new_types:
+            session.execute(self._stmt_add_value_type, [
+                {
+                    "id": value_type_id,
+                    "type_name": "TYPE_%d" % value_type_id,
+                    "type_unit": "UNIT_%d" % value_type_id,
+                }
+                for value_type_id in new_types
+            ])
+        return new_types
+
+    def _add_known_value_types(self, type_ids: Set[int]) -> None:
+        if type_ids:
+            self._value_type_ids.update(type_ids)
+            self._drop_cache()
 
     def add_or_update_value_type(
         self,
         value_type_id: int = None,
         value_type_name: str = None,
         value_type_unit: str = None,
-    ) -> None:
+    ) -> ValueType:
         """update or add a value type
 
         Args:
@@ -31,57 +174,136 @@ class Crud:
             value_type_unit (str, optional): Unit of mesarument wich should be set or updated. Defaults to None.
 
         Returns:
-            _type_: _description_
-        """
-        with Session(self._engine) as session:
-            stmt = select(ValueType).where(ValueType.id == value_type_id)
-            db_type = None
-            for type in session.scalars(stmt):
-                db_type = type
-            if db_type is None:
-                db_type = ValueType(id=value_type_id)
-            if value_type_name:
-                db_type.type_name = value_type_name
-            elif not db_type.type_name:
-                db_type.type_name = "TYPE_%d" % value_type_id
-            if value_type_unit:
-                db_type.type_unit = value_type_unit
-            elif not db_type.type_unit:
-                db_type.type_unit = "UNIT_%d" % value_type_id
-            session.add_all([db_type])
+            ValueType: the added or updated ValueType object
+        """
+        with self._Session() as session:
+            db_type = self._add_or_update_value_type(
+                session, value_type_id, value_type_name, value_type_unit
+            )
             session.commit()
+            self._value_type_ids.add(int(db_type.id))
+            self._drop_cache()
             return db_type
 
+    def _add_or_update_value_type(
+        self,
+        session: Session,
+        value_type_id: int,
+        value_type_name: str,
+        value_type_unit: str,
+    ) -> ValueType:
+        db_type = session.get(ValueType, value_type_id) if value_type_id is not None else None
+        if db_type is None:
+            db_type = ValueType(id=value_type_id)
+            session.add(db_type)
+        if value_type_name:
+            db_type.type_name = value_type_name
+        elif not db_type.type_name:
+            db_type.type_name = "TYPE_%d" % value_type_id
+        if value_type_unit:
+            db_type.type_unit = value_type_unit
+        elif not db_type.type_unit:
+            db_type.type_unit = "UNIT_%d" % value_type_id
+        return db_type
+
     def add_value(self, value_time: int, value_type: int, value_value: float, device_id: int = None) -> None:
         """Add a measurement point to the database, associated with a device.
 
+        A missing ValueType is created in the same transaction as the value.
+
         Args:
             value_time (int): Unix timestamp of the value.
             value_type (int): ValueType id of the given value.
             value_value (float): The measurement value as float.
             device_id (int, optional): ID of the device this value is associated with. Defaults to None.
         """        
-        with Session(self._engine) as session:
-            db_type = self.add_or_update_value_type(value_type)
-            db_value = Value(time=value_time, value=value_value, value_type=db_type, device_id=device_id)
-
-            session.add_all([db_type, db_value])
+        with self._Session() as session:
+            new_types = self._ensure_value_types(session, {value_type})
+            session.add(Value(
+                time=value_time, value=value_value, value_type_id=value_type, device_id=device_id
+            ))
             try:
                 session.commit()
             except IntegrityError:
                 logging.error("Integrity Error occurred")
                 raise
+            self._add_known_value_types(new_types)
+
+    def add_values(self, samples: List[Tuple[int, int, float, int]]) -> int:
+        """Add many measurement points to the database in a single transaction.
+
+        Missing ValueTypes are created on the fly, like in add_value. Values which are already
+        stored are skipped.
+
+        Args:
+            samples (List[Tuple[int, int, float, int]]): (value_time, value_type, value_value,
+                device_id) tuples, in the same order as the arguments of add_value.
+
+        Returns:
+            int: number of values actually inserted
+        """
+        return self.add_values_bulk([
+            {
+                "time": value_time,
+                "value": value_value,
+                "value_type_id": value_type,
+                "device_id": device_id,
+            }
+            for value_time, value_type, value_value, device_id in samples
+        ])
+
+    def add_values_bulk(self, rows: List[dict]) -> int:
+        """Add many measurement points to the database in a single transaction.
+
+        The rows are inserted with executemany in chunks of 1000, without building Value objects.
+        Missing ValueTypes are created on the fly, like in add_value. Rows with the same time,
+        value type and device as an already stored value are skipped (INSERT ... ON CONFLICT DO
+        NOTHING). On databases other than SQLite and PostgreSQL such a row raises IntegrityError
+        and the batch is rolled back.
 
+        Args:
+            rows (List[dict]): one dict per value with the keys time, value, value_type_id and
+                device_id.
+
+        Returns:
+            int: number of values actually inserted, less than len(rows) if duplicates were skipped
+        """
+        if not rows:
+            return 0
+        inserted = 0
+        with self._Session() as session:
+            try:
+                new_types = self._ensure_value_types(
+                    session, {row["value_type_id"] for row in rows}
+                )
+                for i in range(0, len(rows), _BULK_CHUNK_SIZE):
+                    chunk = rows[i:i + _BULK_CHUNK_SIZE]
+                    inserted += session.execute(self._stmt_add_values, chunk).rowcount
+                session.commit()
+            except IntegrityError:
+                logging.error("Integrity Error occurred")
+                raise
+            self._add_known_value_types(new_types)
+        return inserted
 
+    @_cached("get_value_types")
     def get_value_types(self) -> List[ValueType]:
-        """Get all configured value types
+        """Get all configured value types, cached for up to 30 seconds
 
         Returns:
             List[ValueType]: List of ValueType objects. 
         """
-        with Session(self._engine) as session:
-            stmt = select(ValueType)
-            return session.scalars(stmt).all()
+        with self._Session() as session:
+            return session.scalars(_STMT_VALUE_TYPES).all()
+
+    def get_value_type_ids(self) -> List[int]:
+        """Get the ids of all configured value types
+
+        Returns:
+            List[int]: List of ValueType ids.
+        """
+        with self._Session() as session:
+            return session.scalars(_STMT_VALUE_TYPE_IDS).all()
 
     def get_value_type(self, value_type_id: int) -> ValueType:
         """Get a special ValueType
@@ -92,12 +314,16 @@ class Crud:
         Returns:
             ValueType: The ValueType object
         """
-        with Session(self._engine) as session:
-            stmt = select(ValueType).where(ValueType.id == value_type_id)
-            return session.scalars(stmt).one()
+        with self._Session() as session:
+            return session.scalars(_STMT_VALUE_TYPE_BY_ID, {"value_type_id": value_type_id}).one()
 
     def get_values(
-        self, value_type_id: int = None, start: int = None, end: int = None
+        self,
+        value_type_id: int = None,
+        start: int = None,
+        end: int = None,
+        limit: int = None,
+        offset: int = None,
     ) -> List[Value]:
         """Get Values from database.
 
@@ -107,34 +333,98 @@ class Crud:
             value_type_id (int, optional): If set, only value of this given type will be returned. Defaults to None.
             start (int, optional): If set, only values with a timestamp at least as big as start are returned. Defaults to None.
             end (int, optional): If set, only values with a timestamp at most as big as end are returned. Defaults to None.
+            limit (int, optional): If set, at most this many values are returned. Defaults to None.
+            offset (int, optional): If set, this many values are skipped before the first returned
+                one. Defaults to None.
 
         Returns:
             List[Value]: List of Value objects.
         """
-        with Session(self._engine) as session:
-            stmt = select(Value)
-            if value_type_id is not None:
-                stmt = stmt.join(Value.value_type).where(ValueType.id == value_type_id)
-            if start is not None:
-                stmt = stmt.where(Value.time >= start)
-            if end is not None:
-                stmt = stmt.where(Value.time <= end)
-            stmt = stmt.order_by(Value.time)
-            return session.scalars(stmt).all()
+        with self._Session() as session:
+            stmt, params = _pick_values_stmt(
+                _STMT_VALUES, value_type_id, start, end, limit, offset
+            )
+            return session.scalars(stmt, params).all()
+
+    def get_values_raw(
+        self,
+        value_type_id: int = None,
+        start: int = None,
+        end: int = None,
+        limit: int = None,
+        offset: int = None,
+    ) -> List[Row]:
+        """Get Values from database as plain rows instead of Value objects.
+
+        Meant for read only callers, the rows have the attributes id, time, value, value_type_id
+        and device_id. The filters are the same as in get_values.
+
+        Args:
+            value_type_id (int, optional): If set, only value of this given type will be returned.
+                Defaults to None.
+            start (int, optional): If set, only values with a timestamp at least as big as start
+                are returned. Defaults to None.
+            end (int, optional): If set, only values with a timestamp at most as big as end
+                are returned. Defaults to None.
+            limit (int, optional): If set, at most this many values are returned. Defaults to None.
+            offset (int, optional): If set, this many values are skipped before the first returned
+                one. Defaults to None.
+
+        Returns:
+            List[Row]: List of value rows.
+        """
+        with self._Session() as session:
+            stmt, params = _pick_values_stmt(
+                _STMT_VALUE_ROWS, value_type_id, start, end, limit, offset
+            )
+            return session.execute(stmt, params).all()
+
+    def get_values_iter(
+        self, value_type_id: int = None, start: int = None, end: int = None
+    ) -> Iterator[Row]:
+        """Iterate over value rows from database without loading all of them at once.
+
+        Rows are fetched in batches of 1000 through a server side cursor where the driver supports
+        it, the session stays open until the iterator is exhausted or closed.
+        The rows and filters are the same as in get_values_raw.
+
+        Args:
+            value_type_id (int, optional): If set, only value of this given type will be returned.
+                Defaults to None.
+            start (int, optional): If set, only values with a timestamp at least as big as start
+                are returned. Defaults to None.
+            end (int, optional): If set, only values with a timestamp at most as big as end
+                are returned. Defaults to None.
+
+        Yields:
+            Row: the value rows ordered by time
+        """
+        with self._Session() as session:
+            stmt, params = _pick_values_stmt(_STMT_VALUE_ROWS, value_type_id, start, end)
+            yield from session.execute(
+                stmt, params, execution_options={"yield_per": 1000, "stream_results": True}
+            )
 
     def create_location(self, name: str) -> Location:
-        with Session(self._engine) as session:
+        with self._Session() as session:
             new_location = Location(name=name)
             session.add(new_location)
             try:
                 session.commit()
-                session.refresh(new_location)
+                self._drop_cache()
                 return new_location
             except IntegrityError as e:
                 logging.error(f"Database error occurred while creating a new location: {e}")
                 session.rollback()
                 raise
 
+    def register_device_listener(self, listener: Callable[[Device], None]) -> None:
+        """Register a callback which is called with every device added through add_device.
+
+        Args:
+            listener (Callable[[Device], None]): called after the new device is committed.
+        """
+        self._device_listeners.append(listener)
 
     def add_device(self, name: str, description: str, location_id: int) -> Device:
         """Add a new device to the database.
@@ -146,30 +436,29 @@ class Crud:
         Returns:
             Device: The newly created Device object.
         """
-        with Session(self._engine) as session:
+        with self._Session() as session:
             new_device = Device(name=name, description=description, location_id=location_id)
             session.add(new_device)
             try:
                 session.commit()
-                device_id = new_device.id  
-                device_name = new_device.name  
-                device_description = new_device.description  
-                device_location_id = new_device.location_id
             except IntegrityError:
                 logging.error("IntegrityError while adding a new device.")
                 session.rollback()
                 raise
-            return Device(id=device_id, name=device_name, description=device_description, location_id = location_id)
+            self._drop_cache()
+            for listener in self._device_listeners:
+                listener(new_device)
+            return new_device
 
+    @_cached("get_all_device_ids")
     def get_all_device_ids(self) -> List[int]:
-        """Ruft alle Geräte-IDs aus der Datenbank ab.
+        """Ruft alle Geräte-IDs aus der Datenbank ab, bis zu 30 Sekunden zwischengespeichert.
 
         Returns:
             List[int]: Eine Liste aller Geräte-IDs.
         """
-        with Session(self._engine) as session:
-            stmt = select(Device.id)
-            device_ids = session.scalars(stmt).all()
+        with self._Session() as session:
+            device_ids = session.scalars(_STMT_ALL_DEVICE_IDS).all()
             return device_ids
 
     def get_device(self, device_id: int) -> Device:
@@ -184,16 +473,26 @@ class Crud:
         Raises:
             NoResultFound: Wenn kein Gerät mit der gegebenen ID gefunden wird.
         """
-        with Session(self._engine) as session:
-            stmt = select(Device).where(Device.id == device_id)
-            device = session.scalars(stmt).one()
+        with self._Session() as session:
+            device = session.get(Device, device_id)
+            if device is None:
+                raise NoResultFound(f"Kein Gerät mit der ID {device_id} gefunden")
             return device
     
+    @_cached("get_all_locations")
     def get_all_locations(self) -> List[Location]:
-        """Fetch all locations from the database."""
-        with Session(self._engine) as session:
-            stmt = select(Location)
-            locations = session.scalars(stmt).all()
+        """Fetch all locations from the database, cached for up to 30 seconds."""
+        with self._Session() as session:
+            locations = session.scalars(_STMT_ALL_LOCATIONS).all()
             return locations
 
+    @_cached("get_all_locations_raw")
+    def get_all_locations_raw(self) -> List[Row]:
+        """Fetch all locations as plain (id, name) rows instead of Location objects.
+
+        Cached for up to 30 seconds.
+        """
+        with self._Session() as session:
+            return session.execute(_STMT_ALL_LOCATION_ROWS).all()
+
 
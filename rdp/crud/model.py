@@ -1,7 +1,7 @@
 from sqlalchemy import Column, Integer, String, ForeignKey
 from sqlalchemy.orm import relationship, DeclarativeBase, Mapped, mapped_column
 from typing import List, Optional
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import Index, UniqueConstraint
 
 
 
@@ -20,6 +20,7 @@ class Device(Base):
 
     __table_args__ = (
         UniqueConstraint("name", "description", "location_id", name="device integrity"),  # device_id hinzugefügt, für Unique
+        Index("ix_device_location", "location_id"),
     )
 
     def __repr__(self) -> str:
@@ -55,10 +56,18 @@ class Value(Base):
 
     __table_args__ = (
         UniqueConstraint("time", "value_type_id", "device_id", name="value integrity"),  # device_id hinzugefügt, für Unique
+        # der Index des UniqueConstraint beginnt mit time und deckt Zeitbereiche ab
+        Index("ix_value_type_time", "value_type_id", "time"),
+        # deckt auch Abfragen nur nach device_id ab,
+        # SQLite liest den Index für "neueste zuerst" rückwärts
+        Index("ix_value_device_type_time", "device_id", "value_type_id", "time"),
     )
 
     def __repr__(self) -> str:
-        return f"Value(id={self.id!r}, time={self.time!r}, value_type={self.value_type.type_name!r}, device_id={self.device_id!r}, value={self.value!r})"
+        return (
+            f"Value(id={self.id!r}, time={self.time!r}, value_type_id={self.value_type_id!r}, "
+            f"device_id={self.device_id!r}, value={self.value!r})"
+        )
 
 
 class Location(Base):
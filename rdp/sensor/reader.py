@@ -1,24 +1,44 @@
+import asyncio
 import logging
 import struct
-import threading
 import time
 from random import choice
+from typing import List, Tuple
 
 from rdp.crud import Crud
 
 logger = logging.getLogger("rdp.sensor")
 
+# one frame of the character device: u64 time, u32 value type and f32 value, little endian
+_FRAME = struct.Struct("<QIf")
+
 class Reader:
-    def __init__(self, crud: Crud, device: str = "/dev/rdp_cdev"):
+    def __init__(
+        self,
+        crud: Crud,
+        device: str = "/dev/rdp_cdev",
+        batch_size: int = 1000,
+        flush_interval: float = 5.0,
+        read_interval: float = 0.1,
+    ):
         self._crud = crud
         self._device = device
-        self._thread: threading.Thread = None
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._read_interval = read_interval
+        self._task: asyncio.Task = None
         self._device_ids = self._get_all_device_ids()
+        self._crud.register_device_listener(self._on_device_added)
+
+    def _on_device_added(self, device) -> None:
+        """Hilfsfunktion, um neue Geräte in die zwischengespeicherten Geräte-IDs aufzunehmen."""
+        self._device_ids.append(device.id)
 
     def _get_all_device_ids(self):
         """Hilfsfunktion, um alle Geräte-IDs zu erhalten."""
         try:
-            return self._crud.get_all_device_ids()
+            # eigene Kopie, die Liste von Crud ist zwischengespeichert und wird hier erweitert
+            return list(self._crud.get_all_device_ids())
         except Exception as e:
             logger.error(f"Fehler beim Abrufen der Geräte-IDs: {e}")
             return []
@@ -32,46 +52,99 @@ class Reader:
             return []
 
     def start(self) -> None:
+        """Start reading as a task on the running event loop, must be called from within it."""
         self._crud.add_device(name="Device1", description="test", location_id=1)
         self._crud.add_device(name="Device2", description="jkk", location_id=2)
-        self._thread = threading.Thread(target=self._run)
-        self._thread.start()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        self._task.add_done_callback(self._on_task_done)
+
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        """Log the error of a failed reader right away instead of when it is stopped."""
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Sensor reader stopped", exc_info=task.exception())
+
+    async def stop(self) -> None:
+        """Stop reading and wait until the buffered samples are written.
+
+        A reader which was not started or has already finished (or failed) is left as it is.
+        """
+        task = self._task
+        self._task = None
+        if task is not None:
+            # wait does not raise the error of the task, it was logged by _on_task_done
+            await asyncio.wait({task})
+
+    def _read_frame(self) -> Tuple[int, int, float]:
+        with open(self._device, "rb") as f:
+            return _FRAME.unpack(f.read(_FRAME.size))
+
+    def _flush(self, samples: List[dict]) -> bool:
+        """Write buffered samples to the database in one transaction, stored samples are skipped.
 
-    def stop(self):
-        thread = self._thread
-        self._thread = None
-        thread.join()
+        Duplicates are only noticed per batch: the reader stops after the batch which contains the
+        first one, the new samples of that batch are still written. Databases without ON CONFLICT
+        support reject the whole batch, it is then written again sample by sample. Drivers which
+        do not report a rowcount (-1) never stop the reader here.
 
-    def _run(self) -> None:
+        Returns:
+            bool: False if a duplicate value was found (the device started over), otherwise True
+        """
+        if not samples:
+            return True
+        try:
+            inserted = self._crud.add_values_bulk(samples)
+        except self._crud.IntegrityError:
+            return self._flush_each(samples)
+        return inserted < 0 or inserted == len(samples)
+
+    def _flush_each(self, samples: List[dict]) -> bool:
+        """Write samples one transaction each, so a duplicate does not drop the others."""
+        complete = True
+        for sample in samples:
+            try:
+                self._crud.add_value(
+                    sample["time"], sample["value_type_id"], sample["value"], sample["device_id"]
+                )
+            except self._crud.IntegrityError:
+                complete = False
+        return complete
+
+    async def _run(self) -> None:
+        # file and database access block, they run in the default executor to keep the loop free
+        loop = asyncio.get_running_loop()
         count = 0
-        while self._thread is not None:
-            device_id = choice(self._crud.get_all_device_ids())
+        samples = []
+        last_flush = time.monotonic()
+        while self._task is not None:
+            device_id = choice(self._device_ids)
 
             logger.info("A")
-            with open(self._device, "rb") as f:
-                test = f.read(16)
-                value_time = 0
-                for i in range(8):
-                    value_time |= test[i] << 8 * i
-                type_num = 0
-                for i in range(4):
-                    type_num |= test[i + 8] << 8 * i
-                value = struct.unpack("f", test[-4::])[0]
-                logger.debug(
-                    "Read one time: %d type: %d and value: %f",
-                    value_time,
-                    type_num,
-                    value,
-                )
-                try:
-                    self._crud.add_value(value_time, type_num, value, device_id)
-                except self._crud.IntegrityError:
+            value_time, type_num, value = await loop.run_in_executor(None, self._read_frame)
+            logger.debug(
+                "Read one time: %d type: %d and value: %f",
+                value_time,
+                type_num,
+                value,
+            )
+            samples.append({
+                "time": value_time,
+                "value": value,
+                "value_type_id": type_num,
+                "device_id": device_id,
+            })
+
+            batch_full = len(samples) >= self._batch_size
+            if batch_full or time.monotonic() - last_flush >= self._flush_interval:
+                complete = not await loop.run_in_executor(None, self._flush, samples)
+                samples = []
+                last_flush = time.monotonic()
+                if complete:
                     logger.info("All Values read")
                     break
 
-            time.sleep(0.1)
+            await asyncio.sleep(self._read_interval)
             count += 1
             if count % 100 == 0:
                 logger.info("read 100 values")
                 count = 0
-
+        await loop.run_in_executor(None, self._flush, samples)
@@ -1,2 +1,7 @@
 # load fixtures
-from tests.fixtures import crud_in_memory, crud_session_in_memory
+from tests.fixtures import (  # noqa: F401
+    api_client,
+    crud_in_memory,
+    crud_session_in_memory,
+    crud_threaded_in_memory,
+)
@@ -1,7 +1,10 @@
 import pytest
+from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
+from rdp.api import main
 from rdp.crud.crud import Crud
 
 @pytest.fixture(scope="function")
@@ -16,3 +19,21 @@ def crud_session_in_memory():
     crud = Crud(engine)
     session = sessionmaker(bind=engine)
     yield (crud, session)
+
+
+@pytest.fixture(scope="function")
+def crud_threaded_in_memory():
+    # all threads share one connection, otherwise every thread gets its own empty in-memory db
+    engine = create_engine(
+        "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    crud = Crud(engine)
+    yield crud
+
+
+@pytest.fixture(scope="function")
+def api_client(monkeypatch, crud_threaded_in_memory):
+    # the endpoints run in the threadpool
+    monkeypatch.setattr(main, "crud", crud_threaded_in_memory, raising=False)
+    # without a with block the startup event (database file and sensor reader) is not run
+    yield TestClient(main.app), crud_threaded_in_memory
@@ -0,0 +1,37 @@
+from typing import Tuple
+
+from fastapi.testclient import TestClient
+
+from rdp.crud.crud import Crud
+
+
+def test_read_root(api_client: Tuple[TestClient, Crud]):
+    client, _ = api_client
+
+    response = client.get("/")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {
+        "description": "This is the Api",
+        "value_type_link": "/type",
+        "value_link": "/value",
+    }
+
+
+def test_read_locations(api_client: Tuple[TestClient, Crud]):
+    client, crud = api_client
+    crud.create_location("kitchen")
+    crud.create_location("garden")
+
+    response = client.get("/locations/")
+    assert response.status_code == 200
+    assert response.json() == [{"id": 1, "name": "kitchen"}, {"id": 2, "name": "garden"}]
+
+
+def test_openapi_response_schemas(api_client: Tuple[TestClient, Crud]):
+    client, _ = api_client
+
+    paths = client.get("/openapi.json").json()["paths"]
+    for path, model in [("/locations/", "Location"), ("/value/", "Value")]:
+        schema = paths[path]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+        assert schema["items"]["$ref"] == f"#/components/schemas/{model}"
@@ -0,0 +1,41 @@
+from typing import Tuple
+
+from fastapi.testclient import TestClient
+
+from rdp.crud.crud import Crud
+
+
+def test_create_location(api_client: Tuple[TestClient, Crud]):
+    client, _ = api_client
+
+    response = client.post("/create_location/", json={"name": "kitchen"})
+    assert response.status_code == 200
+    assert response.json() == {"id": 1, "name": "kitchen"}
+
+
+def test_create_and_get_device(api_client: Tuple[TestClient, Crud]):
+    client, crud = api_client
+    crud.create_location("kitchen")
+
+    response = client.post("/devices/", json={"name": "Device1", "location_id": 1})
+    assert response.status_code == 200
+    # unset optional fields are left out
+    assert response.json() == {"id": 1, "name": "Device1", "location_id": 1}
+
+    response = client.get("/device/1/")
+    assert response.status_code == 200
+    assert response.json() == {"id": 1, "name": "Device1", "location_id": 1}
+    assert client.get("/device/2/").status_code == 404
+
+
+def test_device_response_schemas(api_client: Tuple[TestClient, Crud]):
+    client, _ = api_client
+
+    paths = client.get("/openapi.json").json()["paths"]
+    for path, method, model in [
+        ("/create_location/", "post", "Location"),
+        ("/device/{device_id}/", "get", "Device"),
+        ("/devices/", "post", "Device"),
+    ]:
+        schema = paths[path][method]["responses"]["200"]["content"]["application/json"]["schema"]
+        assert schema["$ref"] == f"#/components/schemas/{model}"
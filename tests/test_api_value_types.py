@@ -0,0 +1,17 @@
+from typing import Tuple
+
+from fastapi.testclient import TestClient
+
+from rdp.crud.crud import Crud
+
+
+def test_put_type(api_client: Tuple[TestClient, Crud]):
+    client, crud = api_client
+
+    response = client.put("/type/7/", json={"type_name": "weight", "type_unit": "kg"})
+    assert response.status_code == 200
+    assert response.json() == {"id": 7, "type_name": "weight", "type_unit": "kg"}
+    # the path parameter is converted, the cache only holds int ids
+    assert all(isinstance(value_type_id, int) for value_type_id in crud._value_type_ids)
+    response = client.put("/type/abc/", json={"type_name": "weight", "type_unit": "kg"})
+    assert response.status_code == 422
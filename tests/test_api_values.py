@@ -0,0 +1,88 @@
+import asyncio
+from typing import Tuple
+
+import orjson
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from rdp.api import main
+from rdp.crud.crud import Crud
+
+
+def test_get_values_paginated(api_client: Tuple[TestClient, Crud]):
+    client, crud = api_client
+    # several values share a time, the pages must neither skip nor repeat one
+    crud.add_values([
+        (time // 3, time % 3, float(time), device_id) for time in range(9) for device_id in (1, 2)
+    ])
+
+    pages = [
+        client.get("/value/", params={"limit": 4, "offset": offset}).json()
+        for offset in range(0, 18, 4)
+    ]
+    ids = [value["id"] for page in pages for value in page]
+    assert sorted(ids) == ids
+    assert len(set(ids)) == 18
+
+
+def test_get_values_limit_validated(api_client: Tuple[TestClient, Crud]):
+    client, crud = api_client
+    crud.add_values([(time, 1, float(time), 1) for time in range(3)])
+
+    assert client.get("/value/", params={"limit": -1}).status_code == 422
+    assert client.get("/value/", params={"limit": 0}).status_code == 422
+    assert client.get("/value/", params={"limit": 10001}).status_code == 422
+    assert client.get("/value/", params={"offset": -3}).status_code == 422
+    assert len(client.get("/value/", params={"limit": 2}).json()) == 2
+
+
+def test_get_values_projection(api_client: Tuple[TestClient, Crud]):
+    client, crud = api_client
+    crud.add_value(1, 1, 1.5, 1)
+    crud.add_value(2, 1, 2.5)
+
+    # a missing device_id is left out, like in the response model
+    assert client.get("/value/").json() == [
+        {"id": 1, "time": 1, "value": 1.5, "value_type_id": 1, "device_id": 1},
+        {"id": 2, "time": 2, "value": 2.5, "value_type_id": 1},
+    ]
+    assert client.get("/value/", params={"start": 2}).json() == [
+        {"id": 2, "time": 2, "value": 2.5, "value_type_id": 1}
+    ]
+
+
+def test_stream_values(api_client: Tuple[TestClient, Crud]):
+    client, crud = api_client
+    # more than one chunk of 1000 values
+    crud.add_values([(time, time % 2, float(time), 1) for time in range(2500)])
+
+    response = client.get("/value/stream", params={"type_id": 1})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.content.split(b"\n")
+    # every value is terminated by a newline
+    assert lines[-1] == b""
+    values = [orjson.loads(line) for line in lines[:-1]]
+    assert len(values) == 1250
+    assert values[0] == {"id": 2, "time": 1, "value": 1.0, "value_type_id": 1, "device_id": 1}
+    assert [value["time"] for value in values] == list(range(1, 2500, 2))
+
+
+def test_stream_values_closed(monkeypatch, tmp_path):
+    # unlike the in-memory fixtures a file database has a pool which counts the connections
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'rdb.db'}", connect_args={"check_same_thread": False}
+    )
+    crud = Crud(engine)
+    crud.add_values([(time, 1, float(time), 1) for time in range(2500)])
+    monkeypatch.setattr(main, "crud", crud, raising=False)
+
+    async def read_first_chunk():
+        body = main.stream_values().body_iterator
+        assert (await body.__anext__()).count(b"\n") == 1000
+        assert engine.pool.checkedout() == 1
+        # what the response does when the client disconnects
+        await body.aclose()
+
+    asyncio.run(read_first_chunk())
+    assert engine.pool.checkedout() == 0
@@ -0,0 +1,18 @@
+from rdp.crud import create_engine
+
+
+def test_sqlite_pragmas(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rdb.db'}", echo=False)
+
+    with engine.connect() as connection:
+        def pragma(name):
+            return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+        assert pragma("journal_mode") == "wal"
+        # NORMAL
+        assert pragma("synchronous") == 1
+        # MEMORY
+        assert pragma("temp_store") == 2
+        assert pragma("mmap_size") == 268435456
+        assert pragma("cache_size") == -8192
+    engine.dispose()
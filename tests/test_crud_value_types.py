@@ -129,3 +129,42 @@ def test_update_value_types(crud_session_in_memory: Tuple[Crud, Session]):
             assert isinstance(value_type, ValueType)
             assert value_type.id >= 0 and value_type.id <= 3
             assert value_type.type_name in ["name", "weight", "size"]
+
+
+def test_get_value_types_cache_invalidated(crud_in_memory: Crud):
+    assert crud_in_memory.get_value_types() == []
+
+    crud_in_memory.add_or_update_value_type(
+        value_type_id=1, value_type_name="weight", value_type_unit="kg"
+    )
+    result = crud_in_memory.get_value_types()
+    assert len(result) == 1
+    assert result[0].type_name == "weight"
+
+    crud_in_memory.add_value(0, 2, 1.0)
+    assert len(crud_in_memory.get_value_types()) == 2
+
+
+def test_invalidate(crud_session_in_memory: Tuple[Crud, Session]):
+    crud_in_memory, session = crud_session_in_memory
+    assert crud_in_memory.get_value_types() == []
+
+    # changes made outside of Crud are only visible after invalidate
+    with session() as s:
+        s.add(ValueType(id=0, type_name="name", type_unit="UNIT_0"))
+        s.commit()
+    assert crud_in_memory.get_value_types() == []
+
+    crud_in_memory.invalidate()
+    assert len(crud_in_memory.get_value_types()) == 1
+
+    # a value type deleted outside of Crud is created again by the next value
+    crud_in_memory.add_or_update_value_type(
+        value_type_id=1, value_type_name="weight", value_type_unit="kg"
+    )
+    with session() as s:
+        s.delete(s.get(ValueType, 1))
+        s.commit()
+    crud_in_memory.invalidate()
+    crud_in_memory.add_value(1, 1, 1.0, 1)
+    assert crud_in_memory.get_value_type(1).type_name == "TYPE_1"
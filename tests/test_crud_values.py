@@ -2,10 +2,11 @@ import datetime
 from typing import Tuple
 
 import pytest
-from sqlalchemy import select
+from sqlalchemy import create_engine, select
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import InterfaceError, StatementError
 
+from rdp.crud import crud as crud_module
 from rdp.crud.crud import Crud
 from rdp.crud.model import Value
 
@@ -75,3 +76,91 @@ def test_get_values(crud_session_in_memory: Tuple[Crud, Session]):
             datetime.datetime(year=2023, month=9, day=26, second=1).timestamp(),
             datetime.datetime(year=2023, month=9, day=26, second=3).timestamp()
         ]
+
+
+def test_add_values(crud_session_in_memory: Tuple[Crud, Session]):
+    crud_in_memory, session = crud_session_in_memory
+
+    crud_in_memory.add_or_update_value_type(
+        value_type_id=1, value_type_name="weigth", value_type_unit="kg"
+    )
+
+    crud_in_memory.add_values([
+        (int(datetime.datetime(year=2023, month=9, day=26, second=1).timestamp()), 1, 76, 1),
+        (int(datetime.datetime(year=2023, month=9, day=26, second=1).timestamp()), 2, 180, 1),
+        (int(datetime.datetime(year=2023, month=9, day=26, second=3).timestamp()), 1, 77, 1),
+    ])
+
+    with session() as s:
+        result = s.scalars(select(Value)).all()
+        assert len(result) == 3
+        for value in result:
+            assert value.value in [76, 180, 77]
+            assert value.value_type_id in [1, 2]
+
+    # the missing value type got created
+    assert crud_in_memory.get_value_type(2).type_name == "TYPE_2"
+
+    # duplicates are skipped, the rest of the batch is stored
+    inserted = crud_in_memory.add_values([
+        (int(datetime.datetime(year=2023, month=9, day=26, second=5).timestamp()), 1, 78, 1),
+        (int(datetime.datetime(year=2023, month=9, day=26, second=3).timestamp()), 1, 77, 1),
+    ])
+    assert inserted == 1
+    assert len(crud_in_memory.get_values()) == 4
+
+
+def test_get_values_paginated(crud_in_memory: Crud):
+    crud_in_memory.add_values([(time, 1, float(time), 1) for time in range(10)])
+
+    result = crud_in_memory.get_values(limit=3)
+    assert [value.time for value in result] == [0, 1, 2]
+
+    result = crud_in_memory.get_values(start=2, limit=3, offset=3)
+    assert [value.time for value in result] == [5, 6, 7]
+
+    result = list(crud_in_memory.get_values_iter(start=8))
+    assert [value.time for value in result] == [8, 9]
+
+
+def test_get_values_raw(crud_in_memory: Crud):
+    crud_in_memory.add_values([(time, time % 2, float(time), 1) for time in range(6)])
+
+    result = crud_in_memory.get_values_raw(value_type_id=1)
+    assert [(row.time, row.value, row.value_type_id, row.device_id) for row in result] == [
+        (1, 1.0, 1, 1), (3, 3.0, 1, 1), (5, 5.0, 1, 1)
+    ]
+    assert not any(isinstance(row, Value) for row in result)
+
+
+def test_add_values_bulk(crud_in_memory: Crud):
+    rows = [
+        {"time": time, "value": float(time), "value_type_id": 1, "device_id": 1}
+        for time in range(2500)
+    ]
+    assert crud_in_memory.add_values_bulk(rows) == 2500
+
+    result = crud_in_memory.get_values_raw()
+    assert len(result) == 2500
+    assert result[-1].time == 2499
+    assert crud_in_memory.get_value_type(1).type_name == "TYPE_1"
+
+
+def test_value_repr_detached(crud_in_memory: Crud):
+    crud_in_memory.add_value(7, 1, 2.5, 1)
+
+    # the session is closed, repr must not need to load the value type
+    value = crud_in_memory.get_values()[0]
+    expected = f"Value(id={value.id!r}, time=7, value_type_id=1, device_id=1, value=2.5)"
+    assert repr(value) == expected
+
+
+def test_add_values_without_on_conflict(monkeypatch):
+    # a dialect without INSERT ... ON CONFLICT support falls back to a plain insert
+    monkeypatch.setattr(crud_module, "_DIALECT_INSERT", {})
+    crud = Crud(create_engine("sqlite:///:memory:"))
+
+    assert crud.add_values([(1, 1, 1.0, 1), (2, 1, 2.0, 1)]) == 2
+    with pytest.raises(crud.IntegrityError):
+        crud.add_values([(3, 1, 3.0, 1), (2, 1, 2.0, 1)])
+    assert [value.time for value in crud.get_values()] == [1, 2]
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import struct
+from itertools import count, cycle
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from rdp.crud import crud as crud_module
+from rdp.crud.crud import Crud
+from rdp.sensor import Reader
+from rdp.sensor import reader as reader_module
+
+
+@pytest.fixture(autouse=True)
+def first_device(monkeypatch):
+    # always read for the first device, so a repeated frame is a duplicate value
+    monkeypatch.setattr(reader_module, "choice", lambda device_ids: device_ids[0])
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+# the reader writes from executor threads, so the tests use the thread safe crud
+def test_read_frame(crud_threaded_in_memory: Crud, tmp_path):
+    device = tmp_path / "rdp_cdev"
+    device.write_bytes(struct.pack("<QIf", 1234, 3, 2.5))
+
+    reader = Reader(crud_threaded_in_memory, str(device))
+    assert reader._read_frame() == (1234, 3, 2.5)
+
+
+def test_flush_batches_and_stop_on_duplicate(crud_threaded_in_memory: Crud):
+    async def read():
+        reader = Reader(
+            crud_threaded_in_memory, batch_size=3, flush_interval=60, read_interval=0
+        )
+        reader._read_frame = cycle([(1, 1, 1.0), (2, 1, 2.0), (3, 1, 3.0)]).__next__
+        reader.start()
+        # the second batch only contains stored values, the reader ends by itself
+        await asyncio.wait_for(asyncio.shield(reader._task), 5)
+        await reader.stop()
+
+    _run(read())
+    assert [value.time for value in crud_threaded_in_memory.get_values()] == [1, 2, 3]
+
+
+def test_flush_without_on_conflict(monkeypatch):
+    # the batch with the duplicate is rejected as a whole and written again sample by sample
+    monkeypatch.setattr(crud_module, "_DIALECT_INSERT", {})
+    crud = Crud(create_engine(
+        "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    ))
+
+    async def read():
+        reader = Reader(crud, batch_size=3, flush_interval=60, read_interval=0)
+        # the second batch starts with the last value of the first one
+        frames = [(1, 1, 1.0), (2, 1, 2.0), (3, 1, 3.0), (3, 1, 3.0), (4, 1, 4.0), (5, 1, 5.0)]
+        reader._read_frame = iter(frames).__next__
+        reader.start()
+        await asyncio.wait_for(asyncio.shield(reader._task), 5)
+        await reader.stop()
+
+    _run(read())
+    assert [value.time for value in crud.get_values()] == [1, 2, 3, 4, 5]
+
+
+def test_flush_interval(crud_threaded_in_memory: Crud):
+    async def read():
+        reader = Reader(
+            crud_threaded_in_memory, batch_size=1000, flush_interval=0, read_interval=0.01
+        )
+        times = count()
+        reader._read_frame = lambda: (next(times), 1, 1.0)
+        reader.start()
+        await asyncio.sleep(0.2)
+        # the batch is far from full, but the interval has passed
+        assert crud_threaded_in_memory.get_values()
+        await reader.stop()
+
+    _run(read())
+
+
+def test_flush_on_stop(crud_threaded_in_memory: Crud):
+    async def read():
+        reader = Reader(
+            crud_threaded_in_memory, batch_size=1000, flush_interval=60, read_interval=0.01
+        )
+        times = count()
+        reader._read_frame = lambda: (next(times), 1, 1.0)
+        reader.start()
+        await asyncio.sleep(0.2)
+        assert crud_threaded_in_memory.get_values() == []
+        await reader.stop()
+
+    _run(read())
+    assert len(crud_threaded_in_memory.get_values()) > 0
+
+
+def test_failed_reader_is_logged(crud_threaded_in_memory: Crud, caplog):
+    async def read():
+        reader = Reader(crud_threaded_in_memory, "/nonexistent/rdp_cdev")
+        reader.start()
+        await asyncio.sleep(0.2)
+        assert reader._task.done()
+        # stopping a failed reader must not raise its error again
+        await reader.stop()
+        await reader.stop()
+
+    with caplog.at_level(logging.ERROR, logger="rdp.sensor"):
+        _run(read())
+    assert any(
+        record.exc_info and record.exc_info[0] is FileNotFoundError for record in caplog.records
+    )
+
+
+def test_device_listener(crud_threaded_in_memory: Crud):
+    reader = Reader(crud_threaded_in_memory)
+    device = crud_threaded_in_memory.add_device(name="Device3", description="new", location_id=1)
+    assert device.id in reader._device_ids